@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import random
+import argparse
+from collections import Counter
+
+from process_data import (
+    RAW_INPUT_PATH, extract_singapore_addresses,
+    classify_venue_type_from_text, classify_sg_region_from_address,
+    classify_venue_type_from_words, classify_regions_from_addresses
+)
+
+# Micro-benchmark and accuracy comparison of the original classifiers against the
+# ones used by the processing pipeline. The whole-word venue classifier is an accuracy
+# fix, not a speedup: about as fast on clean text (0.8-1.1x) and about 0.5x on text
+# with words like "barbecue", which the substring checks misread and return on early.
+
+VOCABULARY = (
+    "the broth was rich and the queue moved fast while we waited for our order prices are "
+    "reasonable and portions generous with friendly service chicken rice noodles laksa dessert "
+    "coffee tea spicy sweet crispy tender owner family recipe located near mrt station daily"
+).split()
+# Words containing a venue keyword that the substring checks used to misread
+TRAPS = ["barbecue", "barely", "bartender", "public", "republic", "stalled", "embargo"]
+KEYWORDS = ["hawker", "stall", "food court", "bakery", "cafe", "bar", "pub", "bistro", "canteen", "restaurant"]
+
+
+def synthetic_articles(n, words=400, trap_rate=0.01, seed=0):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n):
+        text = [rng.choice(TRAPS) if rng.random() < trap_rate else rng.choice(VOCABULARY) for _ in range(words)]
+        for _ in range(rng.randint(0, 3)):
+            text.insert(rng.randrange(len(text)), rng.choice(KEYWORDS))
+        for _ in range(rng.randint(1, 3)):
+            text.insert(rng.randrange(len(text)), f"{rng.randint(1, 999)} Some Road, Singapore {rng.randint(10000, 829999):06d}.")
+        articles.append({"article_text": " ".join(text)})
+    return articles
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(name, old, new, repeat):
+    old_time, old_results = timed(old, repeat)
+    new_time, new_results = timed(new, repeat)
+    agree = sum(a == b for a, b in zip(old_results, new_results))
+    print(f"{name}: original {old_time * 1000:.1f}ms, current {new_time * 1000:.1f}ms "
+          f"({old_time / new_time if new_time else float('inf'):.1f}x), agreement {agree}/{len(old_results)} "
+          f"({agree / len(old_results) * 100 if old_results else 100:.1f}%)")
+    changes = Counter((str(a), str(b)) for a, b in zip(old_results, new_results) if a != b)
+    for (a, b), count in changes.most_common(10):
+        print(f"  {count:>6}  {a} -> {b}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark venue type and region classifiers.")
+    parser.add_argument('--input', type=str, default=RAW_INPUT_PATH, help='Raw articles JSON; synthetic articles are used if missing')
+    parser.add_argument('--synthetic', type=int, default=10000, help='Number of synthetic articles when no input is available')
+    parser.add_argument('--trap_rate', type=float, default=0.01, help='Share of synthetic words that contain a keyword, e.g. "barbecue"')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions, best run is reported')
+    args = parser.parse_args()
+
+    if os.path.exists(args.input):
+        with open(args.input, 'r') as file:
+            articles = [a for a in json.load(file) if a.get('article_text')]
+        print(f"Loaded {len(articles)} articles from {args.input}")
+    else:
+        articles = synthetic_articles(args.synthetic, trap_rate=args.trap_rate)
+        print(f"Generated {len(articles)} synthetic articles")
+
+    texts = [a['article_text'] for a in articles]
+    addresses = [extract_singapore_addresses(text) for text in texts]
+
+    compare(
+        "Venue type",
+        lambda: [classify_venue_type_from_text(text) for text in texts],
+        lambda: [classify_venue_type_from_words(text) for text in texts],
+        args.repeat
+    )
+    # Regions are compared as sets, the original version does not keep an order
+    compare(
+        "Region",
+        lambda: [sorted({classify_sg_region_from_address(a) for a in addrs} - {"Unknown"}) for addrs in addresses],
+        lambda: [sorted(classify_regions_from_addresses(addrs)) for addrs in addresses],
+        args.repeat
+    )
+
+if __name__ == "__main__":
+    main()
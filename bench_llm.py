@@ -0,0 +1,90 @@
+import sys
+import time
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from huggingface_hub import InferenceClient
+
+from fake_llm_server import make_handler
+from core.llm import HedgedChatClient, LLM_DEADLINE_SECONDS, LLM_HEDGE_DELAY_SECONDS, LLM_CONCURRENT_ANSWERS
+
+# Fires concurrent chat completions at a slow in-process fake_llm_server.py and checks
+# that every answer (model or fallback) is returned within the deadline, i.e. that
+# abandoned requests do not starve later answers.
+
+FALLBACK = "fallback"
+
+
+def start_server(delay, jitter, fail_rate):
+    handler = make_handler(delay, jitter, fail_rate)
+    received = []
+
+    class CountingHandler(handler):
+        def do_POST(self):
+            received.append(time.monotonic())
+            super().do_POST()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    # Requests the client gave up on end in broken pipes, which are expected here
+    server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check LLM deadlines under concurrent slow calls.")
+    parser.add_argument('--answers', type=int, default=3 * LLM_CONCURRENT_ANSWERS, help='Answers requested in total')
+    parser.add_argument('--sessions', type=int, default=LLM_CONCURRENT_ANSWERS, help='Answers requested at the same time')
+    parser.add_argument('--delay', type=float, default=2 * LLM_DEADLINE_SECONDS, help='Fake server delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random fake server delay in seconds')
+    parser.add_argument('--fail_rate', type=float, default=0.0, help='Fraction of fake server requests that fail')
+    parser.add_argument('--deadline', type=float, default=LLM_DEADLINE_SECONDS, help='Latency budget per answer')
+    parser.add_argument('--hedge_delay', type=float, default=LLM_HEDGE_DELAY_SECONDS, help='Delay before the hedged request')
+    parser.add_argument('--slack', type=float, default=0.5, help='Seconds an answer may exceed the deadline by')
+    args = parser.parse_args()
+
+    server, received = start_server(args.delay, args.jitter, args.fail_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = HedgedChatClient(
+        InferenceClient(model=url, timeout=args.deadline),
+        deadline=args.deadline, hedge_delay=args.hedge_delay, concurrency=args.sessions
+    )
+    print(f"Fake LLM server on {url} (delay={args.delay}s, jitter={args.jitter}s, fail_rate={args.fail_rate})")
+
+    def answer(i):
+        start = time.monotonic()
+        text = client.chat_completion([{"role": "user", "content": f"question {i}"}], fallback=lambda: FALLBACK, max_tokens=10)
+        return time.monotonic() - start, text == FALLBACK
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.sessions) as sessions:
+        results = list(sessions.map(answer, range(args.answers)))
+    total = time.monotonic() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    fallbacks = sum(fallback for _, fallback in results)
+    print(f"{len(results)} answers from {args.sessions} sessions in {total:.1f}s: "
+          f"p50 {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s, "
+          f"{fallbacks} fallbacks, {len(received)} requests sent")
+
+    late = [latency for latency in latencies if latency > args.deadline + args.slack]
+    if late:
+        print(f"❌ {len(late)} answers exceeded the {args.deadline:.1f}s deadline")
+        sys.exit(1)
+    print(f"✅ Every answer returned within the {args.deadline:.1f}s deadline")
+
+    # Abandoned requests end at the client timeout, after which every slot must be free again
+    client.executor.shutdown(wait=True)
+    free = client.slots._value
+    if free != 2 * args.sessions:
+        print(f"❌ {2 * args.sessions - free} of {2 * args.sessions} request slots were never released")
+        sys.exit(1)
+    print(f"✅ All {free} request slots released")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
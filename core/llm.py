@@ -0,0 +1,140 @@
+import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from core.retrieval import UNWANTED_KEYWORDS
+
+# Latency budget for one answer, after which the extractive fallback is returned
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+# Send a second, hedged request if the first has not answered after this long
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "6"))
+# Answers expected to be in flight at once, e.g. concurrent Streamlit sessions.
+# Each answer uses up to two requests, so the pool gets two threads per answer;
+# huggingface_hub keeps one HTTP session per thread, so connections are reused
+LLM_CONCURRENT_ANSWERS = int(os.getenv("LLM_CONCURRENT_ANSWERS", "4"))
+
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "at", "best", "can", "for", "food", "good", "i", "in", "is",
+    "me", "near", "of", "on", "or", "place", "places", "recommend", "singapore", "some", "the",
+    "to", "what", "where", "with", "you"
+}
+
+
+class HedgedChatClient:
+    """
+    Wraps an InferenceClient so chat completions are bounded by a deadline.
+    A second request is hedged after hedge_delay (or as soon as the first fails),
+    the first successful response wins, and fallback() is returned if nothing
+    succeeds before the deadline.
+    """
+    def __init__(self, client, deadline=LLM_DEADLINE_SECONDS, hedge_delay=LLM_HEDGE_DELAY_SECONDS, concurrency=LLM_CONCURRENT_ANSWERS):
+        self.client = client
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        pool_size = 2 * concurrency
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        # One slot per pool thread. Requests only start once a thread is free, so
+        # nothing sits in the executor queue behind calls that were already abandoned
+        self.slots = threading.BoundedSemaphore(pool_size)
+
+    def _call(self, messages, kwargs):
+        response = self.client.chat_completion(messages=messages, **kwargs)
+        return response.choices[0].message["content"]
+
+    def _submit(self, messages, kwargs, wait_seconds):
+        # None if no request thread frees up within wait_seconds
+        if not self.slots.acquire(timeout=max(wait_seconds, 0)):
+            return None
+        future = self.executor.submit(self._call, messages, kwargs)
+        # Runs when the call ends and also when a queued call is cancelled, which never runs _call
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def chat_completion(self, messages, fallback, **kwargs):
+        start = time.monotonic()
+        first = self._submit(messages, kwargs, self.deadline)
+        if first is None:
+            print(f"[WARN] No chat request thread was free within the {self.deadline:.1f}s deadline, using extractive answer")
+            return fallback()
+        pending = {first}
+        hedged = False
+
+        try:
+            while pending:
+                remaining = self.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                # Wake up for the hedge point, otherwise wait out the rest of the budget
+                until_hedge = self.hedge_delay - (time.monotonic() - start)
+                timeout = min(remaining, until_hedge) if not hedged and until_hedge > 0 else remaining
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    print(f"[ERROR] Hugging Face chat completion failed: {future.exception()}")
+
+                if not hedged and (done or time.monotonic() - start >= self.hedge_delay):
+                    hedged = True
+                    # Hedge only if a thread is free right now, extra requests under load make it worse
+                    hedge = self._submit(messages, kwargs, 0)
+                    if hedge is not None:
+                        pending.add(hedge)
+
+            if pending:
+                print(f"[WARN] Chat completion missed the {self.deadline:.1f}s deadline, using extractive answer")
+            return fallback()
+        finally:
+            # Requests already sent cannot be interrupted and end at the client timeout,
+            # but none that is still waiting to start should run for an answer already given
+            for future in pending:
+                future.cancel()
+
+
+def split_sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip() and s.strip() != "---"]
+
+
+def top_sentences(query, text, n=2):
+    """
+    Pick the n sentences sharing the most terms with the query, in their original order.
+    Sentences containing unwanted keywords (e.g. "Read more at:") are skipped.
+    """
+    terms = {t for t in re.findall(r"\w+", query.lower()) if t not in STOPWORDS}
+    sentences = [
+        s for s in split_sentences(text)
+        if not any(kw.lower() in s.lower() for kw in UNWANTED_KEYWORDS)
+    ]
+    scored = sorted(
+        enumerate(sentences),
+        key=lambda x: (-len(terms & set(re.findall(r"\w+", x[1].lower()))), x[0])
+    )
+    return [s for _, s in sorted(scored[:n])]
+
+
+def build_extractive_answer(query, context_chunks, n_sentences=2):
+    """
+    Build an answer directly from retrieved chunks and their metadata, used when
+    the LLM is too slow or unavailable.
+    """
+    places = []
+    for chunk in context_chunks:
+        metadata = chunk.get('metadata', {})
+        if not metadata:
+            continue
+        lines = [f"🍽️ Name: {metadata.get('name', 'Unknown Name')}"]
+        if metadata.get('location'):
+            lines.append(f"📍 Location: {metadata['location']}")
+        if metadata.get('cuisine_type'):
+            lines.append(f"🍜 Cuisine / Tags: {metadata['cuisine_type']}")
+        if metadata.get('venue_type'):
+            lines.append(f"🏷️ Venue Type: {metadata['venue_type']}")
+        summary = " ".join(top_sentences(query, chunk.get('content', ''), n=n_sentences))
+        if summary:
+            lines.append(f"💬 Review Summary: {summary}")
+        places.append("\n".join(lines))
+
+    if not places:
+        return "Sorry, I couldn't generate a response."
+    return "Here are some places from our reviews that match your question:\n\n" + "\n\n".join(places)
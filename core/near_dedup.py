@@ -0,0 +1,137 @@
+import os
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+
+# Estimated Jaccard similarity above which two chunks are treated as near-duplicates
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+# bands * rows must equal the number of permutations; 16 bands of 8 rows puts the
+# LSH candidate threshold at roughly (1/16)^(1/8) ~= 0.7
+LSH_BANDS = int(os.getenv("LSH_BANDS", "16"))
+SHINGLE_SIZE = int(os.getenv("SHINGLE_SIZE", "5"))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """
+    Hash the word k-shingles of a text into 32-bit integers.
+    Texts shorter than k words become a single shingle.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < k:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures with a fixed set of random hash permutations.
+    """
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text)
+        # (a * h + b) mod p for every shingle/permutation pair, then min per permutation
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures. Only signatures sharing at least one
+    band bucket are compared, so lookups stay roughly constant time.
+    """
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS, threshold=NEAR_DUP_THRESHOLD):
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.signatures = {}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band][band_key].append(key)
+
+    def find_duplicate(self, signature):
+        """
+        Return (key, similarity) of the first indexed signature whose estimated
+        Jaccard similarity reaches the threshold, or (None, 0.0).
+        """
+        checked = set()
+        for band, band_key in self._band_keys(signature):
+            for key in self.buckets[band].get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                similarity = float(np.mean(self.signatures[key] == signature))
+                if similarity >= self.threshold:
+                    return key, similarity
+        return None, 0.0
+
+    def __len__(self):
+        return len(self.signatures)
+
+
+class NearDuplicateFilter:
+    """
+    Incremental near-duplicate filter over a stream of chunked articles.
+    The first occurrence of a chunk is kept as canonical; later near-duplicates
+    are dropped and reported with a pointer to it.
+    """
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS):
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.index = LSHIndex(num_perm=num_perm, bands=bands, threshold=threshold)
+        self.total = 0
+        self.removed = 0
+
+    def filter_chunks(self, article_key, chunks):
+        """
+        Return (kept_chunks, duplicates) for one article. Each duplicate is
+        {"original_chunk", "canonical_url", "canonical_chunk", "similarity"}, where
+        original_chunk is the dropped chunk's position in the input chunks and
+        canonical_chunk is the canonical chunk's position in its article after removal,
+        i.e. the "chunk" metadata it is stored under.
+        """
+        kept, duplicates = [], []
+        for c, chunk in enumerate(chunks):
+            self.total += 1
+            signature = self.hasher.signature(chunk)
+            canonical, similarity = self.index.find_duplicate(signature)
+            if canonical is None:
+                # Kept chunks are keyed by their final position, so pointers stay valid
+                self.index.add((article_key, len(kept)), signature)
+                kept.append(chunk)
+            else:
+                self.removed += 1
+                duplicates.append({
+                    "original_chunk": c,
+                    "canonical_url": canonical[0],
+                    "canonical_chunk": canonical[1],
+                    "similarity": similarity
+                })
+        return kept, duplicates
+
+    def stats(self):
+        return {
+            "total": self.total,
+            "kept": self.total - self.removed,
+            "removed": self.removed,
+            "reduction": (self.removed / self.total * 100) if self.total else 0.0,
+        }
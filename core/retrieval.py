@@ -3,6 +3,8 @@ import math
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from collections import defaultdict
+from chromadb.errors import NotFoundError
+from core.sharding import expand_region_filter
 
 # Load unwanted keywords and penalty settings from environment
 UNWANTED_KEYWORDS = os.getenv("UNWANTED_KEYWORDS", "Read more at:").split(",")
@@ -11,17 +13,22 @@ UNWANTED_PENALTY = float(os.getenv("UNWANTED_PENALTY", "0.2"))
 UNWANTED_PENALTY_SCALE = float(os.getenv("UNWANTED_PENALTY_SCALE", "2.0"))
 UNWANTED_PENALTY_MAXLEN = int(os.getenv("UNWANTED_PENALTY_MAXLEN", "500"))
 
+# Article-level index built by gen_embeddings.py alongside the chunk collection
+ARTICLE_COLLECTION_NAME = "food_places_articles"
+ARTICLE_POOLING = os.getenv("ARTICLE_POOLING", "mean")
+
+def cosine_similarity(a, b):
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
 def calculate_similarity(model, chunk, query):
     """
     Calculate the cosine similarity between a chunk and a query.
     """
     chunk_embedding = model.encode(chunk).tolist()
     query_embedding = model.encode(query).tolist()
-    sim = np.dot(query_embedding, chunk_embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(chunk_embedding))
-    return sim
+    return cosine_similarity(query_embedding, chunk_embedding)
 
-def calculate_penalized_score(model, doc, query):
-    sim = calculate_similarity(model, doc, query)
+def calculate_keyword_penalty(doc):
     # Initialize penalty
     penalty = 0.0
     for kw in UNWANTED_KEYWORDS:
@@ -33,17 +40,53 @@ def calculate_penalized_score(model, doc, query):
             # Exponential penalty based on the normalized length
             exp_penalty = UNWANTED_PENALTY * math.exp(UNWANTED_PENALTY_SCALE * (1 - norm_len))
             penalty += exp_penalty
-    penalized_score = sim - penalty
+    return penalty
+
+def calculate_penalized_score(model, doc, query):
+    sim = calculate_similarity(model, doc, query)
+    penalized_score = sim - calculate_keyword_penalty(doc)
     return penalized_score
 
+def pool_article_embeddings(embeddings, method=ARTICLE_POOLING):
+    """
+    Pool an article's chunk embeddings into a single unit-length article vector.
+    method is "mean" (centroid) or "max" (element-wise max pooling).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if method == "max":
+        pooled = embeddings.max(axis=0)
+    else:
+        pooled = embeddings.mean(axis=0)
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
 
-def retrieve_relevant_chunks(query, collection, model, metadata_filter = None, top_k=5, top_j=2):
+def open_article_collection(client):
     """
-    Retrieve top K articles and top J relevant chunks per article from a ChromaDB collection.
-    Returns a list of dicts: [{article_name, chunks: [chunk_info, ...]}, ...]
-    Each chunk_info contains: penalized_score, similarity, penalty, doc, meta
+    Return the article-level collection if it has been built, otherwise None.
     """
-    embedding = model.encode(query).tolist()
+    try:
+        collection = client.get_collection(ARTICLE_COLLECTION_NAME)
+    except NotFoundError:
+        return None
+    return collection if collection.count() > 0 else None
+
+def retrieve_top_articles(embedding, collection, article_collection=None, metadata_filter=None, top_k=5, top_j=2):
+    """
+    Return the names of the top K articles for a query embedding.
+    Uses the article-level index when available, otherwise ranks articles by their best chunk.
+    """
+    if article_collection is not None:
+        results = article_collection.query(
+            query_embeddings=[embedding],
+            # Over-fetch so top_k distinct names remain after deduplication
+            n_results=top_k * 2,
+            include=["metadatas", "distances"],
+            where=metadata_filter
+        )
+        # Several articles can share a name, keep the first (closest) occurrence
+        names = [meta.get('name', '') for meta in results["metadatas"][0]]
+        return list(dict.fromkeys(names))[:top_k]
+
     n_results = max(100, top_k * top_j * 5)
     results = collection.query(
         query_embeddings=[embedding],
@@ -62,26 +105,59 @@ def retrieve_relevant_chunks(query, collection, model, metadata_filter = None, t
             article_best_chunk[article_name] = (dist, doc, meta)
 
     sorted_articles = sorted(article_best_chunk.items(), key=lambda x: x[1][0])
-    top_articles = [name for name, _ in sorted_articles[:top_k]]
+    return [name for name, _ in sorted_articles[:top_k]]
+
+
+def retrieve_relevant_chunks(query, collection, model, metadata_filter = None, top_k=5, top_j=2, article_collection=None):
+    """
+    Retrieve top K articles and top J relevant chunks per article from a ChromaDB collection.
+    If article_collection is given, articles are picked from the article-level index first
+    and only the chunks of those articles are scored.
+    Returns a list of dicts: [{article_name, chunks: [chunk_info, ...]}, ...]
+    Each chunk_info contains: penalized_score, similarity, penalty, doc, meta
+    """
+    # {"region": "East"} also has to match "Central, East" articles, on every backend
+    metadata_filter = expand_region_filter(metadata_filter)
+    if hasattr(collection, "pinned"):
+        # Shared indexes: read chunks and articles from one published generation,
+        # even if a new one is switched in between the two stages
+        collection = collection.pinned()
+        if article_collection is not None:
+            article_collection = article_collection.pinned(collection.generation)
+    embedding = model.encode(query).tolist()
+    top_articles = retrieve_top_articles(
+        embedding, collection, article_collection,
+        metadata_filter=metadata_filter, top_k=top_k, top_j=top_j
+    )
+    if not top_articles:
+        return []
+
+    # Fetch the chunks of all selected articles in one call, with their stored embeddings.
+    # The query's filter is kept so region-sharded collections only read the matching shards
+    chunk_filter = {"name": {"$in": top_articles}}
+    if metadata_filter:
+        chunk_filter = {"$and": [chunk_filter, metadata_filter]}
+    article_data = collection.get(
+        where=chunk_filter,
+        include=["documents", "metadatas", "embeddings"]
+    )
+    article_chunks = {name: [] for name in top_articles}
+    for doc, meta, chunk_embedding in zip(article_data["documents"], article_data["metadatas"], article_data["embeddings"]):
+        sim = cosine_similarity(embedding, chunk_embedding)
+        penalty = calculate_keyword_penalty(doc)
+        penalized_score = sim - penalty
+        print(f"Doc: {doc}, Meta: {meta}, Similarity: {sim}, Penalized Score: {penalized_score}")
+        article_chunks[meta.get('name', '')].append({
+            "penalized_score": penalized_score,
+            "similarity": sim,
+            "penalty": penalty,
+            "doc": doc,
+            "meta": meta
+        })
 
     results = []
     for article_name in top_articles:
-        article_data = collection.get(where={"name": article_name})
-        article_docs = article_data["documents"]
-        article_metas = article_data["metadatas"]
-        chunk_scores = []
-        for doc, meta in zip(article_docs, article_metas):
-            chunk_embedding = model.encode(doc).tolist()
-            # sim = np.dot(embedding, chunk_embedding) / (np.linalg.norm(embedding) * np.linalg.norm(chunk_embedding))
-            sim = calculate_similarity(model, doc, query)
-            penalized_score = calculate_penalized_score(model, doc, query)
-            print(f"Doc: {doc}, Meta: {meta}, Similarity: {sim}, Penalized Score: {penalized_score}")
-            chunk_scores.append({
-                "penalized_score": penalized_score,
-                "similarity": sim,
-                "doc": doc,
-                "meta": meta
-            })
+        chunk_scores = article_chunks[article_name]
         # Sort and filter to unique chunk indices
         chunk_scores.sort(reverse=True, key=lambda x: x["penalized_score"])
         seen_chunks = set()
@@ -0,0 +1,205 @@
+import os
+import re
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+# Partition the chunk collection into one collection per region
+SHARD_BY_REGION = os.getenv("SHARD_BY_REGION", "false").strip().lower() in ("1", "true", "yes")
+SHARD_QUERY_WORKERS = int(os.getenv("SHARD_QUERY_WORKERS", "8"))
+
+
+def _slug(region):
+    return re.sub(r'[^a-z0-9]+', '-', region.lower()).strip('-')
+
+
+def shard_name(collection_name, region):
+    """
+    Collection name for a region shard, e.g. food_places__north-east.
+    """
+    return f"{collection_name}__{_slug(region)}"
+
+
+def region_key(region):
+    """
+    Boolean metadata key set on every record of a region, e.g. region_north-east.
+    The "region" string of a multi-region article reads "Central, East", so exact
+    matching on it misses such articles; these keys match them on every backend.
+    """
+    return f"region_{_slug(region)}"
+
+
+def region_keys(regions):
+    return {region_key(region): True for region in regions}
+
+
+def expand_region_filter(where):
+    """
+    Rewrite {"region": ...} equality and $in clauses into region_key() clauses,
+    e.g. {"region": "East"} -> {"region_east": True}. Other clauses are kept as they are.
+    """
+    if not where:
+        return where
+    clauses = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            clauses.append({key: [expand_region_filter(clause) for clause in condition]})
+            continue
+        regions = None
+        if key == "region":
+            if not isinstance(condition, dict):
+                regions = [condition]
+            elif "$eq" in condition:
+                regions = [condition["$eq"]]
+            elif condition.get("$in"):
+                regions = list(condition["$in"])
+        if regions is None:
+            clauses.append({key: condition})
+        elif len(regions) == 1:
+            clauses.append({region_key(regions[0]): True})
+        else:
+            clauses.append({"$or": [{region_key(region): True} for region in regions]})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def list_shards(client, collection_name):
+    """
+    Return {region: collection} for every region shard of a collection.
+    """
+    prefix = f"{collection_name}__"
+    shards = {}
+    for item in client.list_collections():
+        name = getattr(item, "name", item)
+        if not name.startswith(prefix):
+            continue
+        shard = client.get_collection(name=name)
+        region = (shard.metadata or {}).get("region", name[len(prefix):])
+        shards[region] = shard
+    return shards
+
+
+def route_regions(where, regions):
+    """
+    Return the subset of regions whose shards can hold records matching where,
+    or None when the filter does not constrain region (all shards are needed).
+    Understands region_key() clauses, also inside $or and a top-level $and.
+    """
+    keys = {region_key(region): region for region in regions}
+
+    def clause_regions(clause):
+        if not clause or len(clause) != 1:
+            return None
+        (key, condition), = clause.items()
+        if key == "$or":
+            parts = [clause_regions(part) for part in condition]
+            return set().union(*parts) if parts and None not in parts else None
+        if key == "$and":
+            parts = [part for part in map(clause_regions, condition) if part is not None]
+            return set.intersection(*parts) if parts else None
+        if key.startswith("region_") and condition in (True, {"$eq": True}):
+            return {keys[key]} if key in keys else set()
+        return None
+
+    routed = clause_regions(expand_region_filter(where))
+    return None if routed is None else [region for region in regions if region in routed]
+
+
+class ShardedCollection:
+    """
+    Read-only view over region shards that mimics the query()/get() interface of a
+    ChromaDB collection. Region filters route to the matching shards, which still
+    apply the whole filter themselves, so results match an unsharded collection;
+    otherwise all shards are queried concurrently and results are merged by distance.
+    Articles spanning several regions live in several shards under the same id
+    and are deduplicated at merge time.
+    """
+    def __init__(self, shards, max_workers=SHARD_QUERY_WORKERS):
+        self.shards = shards
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards) or 1)))
+        self.last_query_stats = {}
+
+    @classmethod
+    def from_client(cls, client, collection_name, max_workers=SHARD_QUERY_WORKERS):
+        return cls(list_shards(client, collection_name), max_workers=max_workers)
+
+    def shard_sizes(self):
+        return {region: shard.count() for region, shard in self.shards.items()}
+
+    def count(self):
+        return sum(self.shard_sizes().values())
+
+    def _select(self, where):
+        where = expand_region_filter(where)
+        regions = route_regions(where, list(self.shards))
+        if regions is None:
+            return list(self.shards.items()), where
+        return [(region, self.shards[region]) for region in regions], where
+
+    def _fan_out(self, shards, call):
+        def timed(region, shard):
+            start = time.perf_counter()
+            result = call(shard)
+            return region, result, time.perf_counter() - start
+
+        futures = [self.executor.submit(timed, region, shard) for region, shard in shards]
+        outputs = [future.result() for future in futures]
+        self.last_query_stats = {region: elapsed for region, _, elapsed in outputs}
+        print("Shard latency: " + ", ".join(f"{region}={elapsed * 1000:.1f}ms" for region, elapsed in self.last_query_stats.items()))
+        return [result for _, result, _ in outputs]
+
+    def query(self, query_embeddings, n_results=10, include=None, where=None):
+        if include is None:
+            include = ["documents", "metadatas", "distances"]
+        include = list(dict.fromkeys(list(include) + ["distances"]))
+        shards, where = self._select(where)
+        shard_results = self._fan_out(
+            shards,
+            lambda shard: shard.query(query_embeddings=query_embeddings, n_results=n_results, include=include, where=where)
+        )
+
+        fields = [field for field in include if field != "distances"]
+        merged = {"ids": [], "distances": [], **{field: [] for field in fields}}
+        for q in range(len(query_embeddings)):
+            # Each shard returns rows sorted by distance, so a heap merge yields the global order
+            streams = [
+                [(result["distances"][q][i], s, i) for i in range(len(result["ids"][q]))]
+                for s, result in enumerate(shard_results)
+            ]
+            rows = {"ids": [], "distances": [], **{field: [] for field in fields}}
+            seen = set()
+            for dist, s, i in heapq.merge(*streams):
+                result = shard_results[s]
+                record_id = result["ids"][q][i]
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                rows["ids"].append(record_id)
+                rows["distances"].append(dist)
+                for field in fields:
+                    rows[field].append(result[field][q][i])
+                if len(rows["ids"]) >= n_results:
+                    break
+            for key, values in rows.items():
+                merged[key].append(values)
+        return merged
+
+    def get(self, ids=None, where=None, include=None):
+        if include is None:
+            include = ["documents", "metadatas"]
+        shards, where = self._select(where)
+        shard_results = self._fan_out(
+            shards,
+            lambda shard: shard.get(ids=ids, where=where, include=include)
+        )
+
+        merged = {"ids": [], **{field: [] for field in include}}
+        seen = set()
+        for result in shard_results:
+            for i, record_id in enumerate(result["ids"]):
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                merged["ids"].append(record_id)
+                for field in include:
+                    merged[field].append(result[field][i])
+        return merged
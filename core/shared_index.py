@@ -0,0 +1,329 @@
+import os
+import json
+import fcntl
+import shutil
+import tempfile
+import contextlib
+import numpy as np
+from core.snapshot import iter_collection_batches, SNAPSHOT_BATCH_SIZE
+
+# Root directory of the published index, shared by every worker process on the host
+SHARED_INDEX_PATH = os.getenv("SHARED_INDEX_PATH", "")
+# Older generations kept on disk so workers still attached to them are not cut off
+SHARED_INDEX_KEEP_GENERATIONS = int(os.getenv("SHARED_INDEX_KEEP_GENERATIONS", "2"))
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "publish.lock"
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+
+
+def _generation_dir(root, generation):
+    return os.path.join(root, f"gen-{generation:06d}")
+
+
+def read_generation(root):
+    """
+    Return the generation currently published under root, or 0 if none.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def list_shared_indexes(root):
+    """
+    Return the names of the indexes in the generation currently published under root.
+    """
+    generation = read_generation(root)
+    if generation == 0:
+        return []
+    return sorted(os.listdir(_generation_dir(root, generation)))
+
+
+@contextlib.contextmanager
+def _publish_lock(root):
+    """
+    Exclusive lock serialising publishers (gen_embeddings.py, ingest.py, snapshot.py) on one root.
+    """
+    with open(os.path.join(root, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _next_generation(root):
+    generations = [read_generation(root)]
+    for entry in os.listdir(root):
+        if entry.startswith("gen-") and entry[4:].isdigit():
+            generations.append(int(entry[4:]))
+    return max(generations) + 1
+
+
+def publish_shared_index(indexes, root, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Publish named indexes, e.g. {"food_places": region_shards, "food_places_articles": [articles]},
+    together as a new read-only generation under root, then atomically point CURRENT at it.
+    Every index of a generation is switched by the same CURRENT file, so readers never pair
+    chunks from one build with articles from another.
+
+    Layout of a generation directory, one subdirectory per index name:
+    - embeddings.f32: contiguous unit-length float32 matrix
+    - ids.bin/ids.offsets.npy, documents.bin/documents.offsets.npy: UTF-8 blobs with row offsets
+    - meta.<key>.codes.npy: dictionary-encoded metadata column (-1 when missing)
+    - manifest.json: row count, dimension and the category values of each metadata column
+    The indexes are written to a staging directory first; the generation number is only
+    picked under an exclusive lock, so concurrent publishers never write into the same
+    directory or move CURRENT backwards. Returns the new generation number.
+    """
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix="staging-", dir=root)
+    # mkdtemp creates the directory private to this user, workers need to read it
+    os.chmod(staging, 0o755)
+    try:
+        for name, collections in indexes.items():
+            _write_index(collections, os.path.join(staging, name), batch_size)
+
+        with _publish_lock(root):
+            generation = _next_generation(root)
+            os.rename(staging, _generation_dir(root, generation))
+            # Switch readers over atomically, then prune generations nobody should still need
+            tmp = os.path.join(root, CURRENT_FILE + ".tmp")
+            with open(tmp, "w") as f:
+                f.write(str(generation))
+            os.replace(tmp, os.path.join(root, CURRENT_FILE))
+            for old in range(generation - SHARED_INDEX_KEEP_GENERATIONS, 0, -1):
+                if not os.path.isdir(_generation_dir(root, old)):
+                    break
+                shutil.rmtree(_generation_dir(root, old), ignore_errors=True)
+    finally:
+        # Only left behind if writing failed before the rename
+        shutil.rmtree(staging, ignore_errors=True)
+    return generation
+
+
+def _write_index(collections, path, batch_size):
+    """
+    Write one or more collections (e.g. region shards) as a single index directory.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    seen_ids = set()
+    offsets = {"ids": [0], "documents": [0]}
+    categories = {}   # key -> {value: code}
+    codes = {}        # key -> per-row codes, padded with -1 for rows before the key appeared
+    rows = 0
+    dim = 0
+    with open(os.path.join(path, EMBEDDINGS_FILE), "wb") as emb_file, \
+            open(os.path.join(path, "ids.bin"), "wb") as ids_file, \
+            open(os.path.join(path, "documents.bin"), "wb") as docs_file:
+        for collection in collections:
+            for batch in iter_collection_batches(collection, batch_size, include=["embeddings", "documents", "metadatas"]):
+                keep = [i for i, record_id in enumerate(batch["ids"]) if record_id not in seen_ids]
+                if not keep:
+                    continue
+                embeddings = np.asarray(batch["embeddings"], dtype=np.float32)[keep]
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings = embeddings / np.where(norms > 0, norms, 1)
+                dim = embeddings.shape[1]
+                emb_file.write(np.ascontiguousarray(embeddings).tobytes())
+
+                for i in keep:
+                    record_id = batch["ids"][i]
+                    seen_ids.add(record_id)
+                    for name, blob_file, value in (("ids", ids_file, record_id), ("documents", docs_file, batch["documents"][i] or "")):
+                        data = value.encode("utf-8")
+                        blob_file.write(data)
+                        offsets[name].append(offsets[name][-1] + len(data))
+                    meta = batch["metadatas"][i] or {}
+                    for key, value in meta.items():
+                        column = codes.setdefault(key, [-1] * rows)
+                        column.append(categories.setdefault(key, {}).setdefault(value, len(categories[key])))
+                    rows += 1
+                    for key, column in codes.items():
+                        if len(column) < rows:
+                            column.append(-1)
+
+    for name, values in offsets.items():
+        np.save(os.path.join(path, f"{name}.offsets.npy"), np.asarray(values, dtype=np.int64))
+    for key, column in codes.items():
+        np.save(os.path.join(path, f"meta.{key}.codes.npy"), np.asarray(column, dtype=np.int32))
+    manifest = {
+        "count": rows,
+        "dim": dim,
+        "metadata": {key: list(values) for key, values in categories.items()},
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+class _BlobColumn:
+    """
+    Memory-mapped UTF-8 string column, decoded one row at a time.
+    """
+    def __init__(self, path, name):
+        self.offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(path, f"{name}.bin")
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.zeros(0, dtype=np.uint8)
+
+    def __getitem__(self, row):
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+
+class _Generation:
+    """
+    Read-only view of one published generation. Every array is a memory map, so
+    all worker processes share the same physical pages.
+    """
+    def __init__(self, root, generation, name):
+        path = os.path.join(_generation_dir(root, generation), name)
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.generation = generation
+        self.count = manifest["count"]
+        if self.count:
+            self.embeddings = np.memmap(os.path.join(path, EMBEDDINGS_FILE), dtype=np.float32, mode="r",
+                                        shape=(self.count, manifest["dim"]))
+        else:
+            self.embeddings = np.zeros((0, manifest["dim"]), dtype=np.float32)
+        self.ids = _BlobColumn(path, "ids")
+        self.documents = _BlobColumn(path, "documents")
+        self.categories = manifest["metadata"]
+        self.codes = {key: np.load(os.path.join(path, f"meta.{key}.codes.npy"), mmap_mode="r") for key in self.categories}
+        self._id_rows = None
+
+    def metadata(self, row):
+        meta = {}
+        for key, column in self.codes.items():
+            code = column[row]
+            if code >= 0:
+                meta[key] = self.categories[key][code]
+        return meta
+
+    def row_of(self, record_id):
+        if self._id_rows is None:
+            self._id_rows = {self.ids[row]: row for row in range(self.count)}
+        return self._id_rows.get(record_id)
+
+    def mask(self, where):
+        """
+        Boolean row mask for the subset of Chroma's where syntax used here:
+        {key: value}, {key: {"$eq"/"$ne"/"$in"/"$nin": ...}}, "$and" and "$or".
+        """
+        mask = np.ones(self.count, dtype=bool)
+        if not where:
+            return mask
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.mask(clause)
+                continue
+            if key == "$or":
+                mask &= np.logical_or.reduce([self.mask(clause) for clause in condition])
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            (op, value), = condition.items()
+            values = value if op in ("$in", "$nin") else [value]
+            lookup = {v: code for code, v in enumerate(self.categories.get(key, []))}
+            wanted = [lookup[v] for v in values if v in lookup]
+            matched = np.isin(self.codes[key], wanted) if key in self.codes else np.zeros(self.count, dtype=bool)
+            mask &= ~matched if op in ("$ne", "$nin") else matched
+        return mask
+
+
+class SharedIndex:
+    """
+    Zero-copy, read-only view of one named index published by gen_embeddings.py.
+    Mimics the query()/get() interface of a ChromaDB collection so retrieve_relevant_chunks
+    can use it directly. Each call checks the generation counter and switches to
+    a newer index as soon as one is published, unless the index is pinned().
+    """
+    def __init__(self, root, name, view=None):
+        self.root = root
+        self.name = name
+        self._view = view
+        self._pinned = view is not None
+        self.refresh()
+
+    def refresh(self):
+        if self._pinned:
+            return self._view
+        generation = read_generation(self.root)
+        if generation == 0:
+            raise FileNotFoundError(f"No shared index has been published under {self.root}")
+        if self._view is None or self._view.generation != generation:
+            # A single reference swap, so concurrent callers see either the old or the new view
+            self._view = _Generation(self.root, generation, self.name)
+        return self._view
+
+    @property
+    def generation(self):
+        return self._view.generation
+
+    def pinned(self, generation=None):
+        """
+        Return a view of this index fixed at one generation (the current one by default),
+        so several calls, or several indexes, read the same build.
+        """
+        view = self.refresh()
+        if generation is not None and view.generation != generation:
+            view = _Generation(self.root, generation, self.name)
+        return SharedIndex(self.root, self.name, view=view)
+
+    def count(self):
+        return self.refresh().count
+
+    def _rows(self, view, rows, include):
+        records = {"ids": [view.ids[row] for row in rows]}
+        if "documents" in include:
+            records["documents"] = [view.documents[row] for row in rows]
+        if "metadatas" in include:
+            records["metadatas"] = [view.metadata(row) for row in rows]
+        if "embeddings" in include:
+            records["embeddings"] = np.asarray(view.embeddings[rows])
+        return records
+
+    def query(self, query_embeddings, n_results=10, include=None, where=None):
+        if include is None:
+            include = ["documents", "metadatas", "distances"]
+        view = self.refresh()
+        if where:
+            candidates = np.flatnonzero(view.mask(where))
+            matrix = view.embeddings[candidates]
+        else:
+            # Unfiltered queries read straight from the shared mapping without copying it
+            candidates = np.arange(view.count)
+            matrix = view.embeddings
+        merged = {"ids": [], **{field: [] for field in include}}
+        for query_embedding in query_embeddings:
+            q = np.asarray(query_embedding, dtype=np.float32)
+            q = q / (np.linalg.norm(q) or 1)
+            # Squared L2 between unit vectors, the same ranking Chroma's default space gives
+            distances = 2 - 2 * (matrix @ q)
+            k = min(n_results, len(candidates))
+            top = np.argpartition(distances, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+            top = top[np.argsort(distances[top])]
+            records = self._rows(view, candidates[top], include)
+            records["distances"] = distances[top].tolist()
+            for field in merged:
+                merged[field].append(records[field])
+        return merged
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        if include is None:
+            include = ["documents", "metadatas"]
+        view = self.refresh()
+        mask = view.mask(where)
+        if ids is not None:
+            id_mask = np.zeros(view.count, dtype=bool)
+            id_mask[[row for row in map(view.row_of, ids) if row is not None]] = True
+            mask &= id_mask
+        rows = np.flatnonzero(mask)
+        start = offset or 0
+        rows = rows[start:start + limit] if limit is not None else rows[start:]
+        return self._rows(view, rows, include)
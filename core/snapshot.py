@@ -0,0 +1,143 @@
+import os
+import json
+import numpy as np
+
+# Chroma caps a single add/upsert at ~5461 records, so stay below that by default
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "5000"))
+
+EMBEDDINGS_FILE = "embeddings.npy"
+TABLE_FILE = "table.json"
+
+
+def iter_collection_batches(collection, batch_size=SNAPSHOT_BATCH_SIZE, include=None, where=None):
+    """
+    Page through a ChromaDB collection with limit/offset instead of one get() per id.
+    Yields the raw get() result dict for each page.
+    """
+    if include is None:
+        include = ["documents", "metadatas"]
+    offset = 0
+    while True:
+        batch = collection.get(limit=batch_size, offset=offset, include=include, where=where)
+        if not batch["ids"]:
+            break
+        yield batch
+        offset += len(batch["ids"])
+        if len(batch["ids"]) < batch_size:
+            break
+
+
+def export_snapshot(collection, path, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Stream a collection to a snapshot directory:
+    - embeddings.npy: contiguous float32 matrix, one row per record
+    - table.json: columnar table with ids, documents, one column per metadata key
+      and the collection's own metadata (e.g. the region of a shard)
+    Returns the number of records written.
+    """
+    os.makedirs(path, exist_ok=True)
+    total = collection.count()
+
+    embeddings = None
+    ids, documents, metadatas = [], [], []
+    row = 0
+    for batch in iter_collection_batches(collection, batch_size, include=["embeddings", "documents", "metadatas"]):
+        batch_embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        if embeddings is None:
+            # Preallocate on disk so the matrix never has to be held in memory
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(path, EMBEDDINGS_FILE), mode="w+", dtype=np.float32,
+                shape=(total, batch_embeddings.shape[1])
+            )
+        embeddings[row:row + len(batch_embeddings)] = batch_embeddings
+        row += len(batch_embeddings)
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(meta or {} for meta in batch["metadatas"])
+
+    if embeddings is None:
+        np.save(os.path.join(path, EMBEDDINGS_FILE), np.zeros((0, 0), dtype=np.float32))
+    else:
+        embeddings.flush()
+        del embeddings
+
+    keys = sorted({key for meta in metadatas for key in meta})
+    table = {
+        "ids": ids,
+        "documents": documents,
+        "metadatas": {key: [meta.get(key) for meta in metadatas] for key in keys},
+        "collection_metadata": collection.metadata,
+    }
+    with open(os.path.join(path, TABLE_FILE), "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+    return row
+
+
+def load_snapshot(path, mmap_mode="r"):
+    """
+    Load a snapshot directory. Embeddings are memory-mapped by default.
+    Returns (ids, embeddings, documents, metadatas) with metadatas as a list of dicts.
+    """
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode=mmap_mode)
+    with open(os.path.join(path, TABLE_FILE), "r", encoding="utf-8") as f:
+        table = json.load(f)
+
+    ids = table["ids"]
+    columns = table["metadatas"]
+    metadatas = [
+        {key: values[i] for key, values in columns.items() if values[i] is not None}
+        for i in range(len(ids))
+    ]
+    return ids, embeddings, table["documents"], metadatas
+
+
+def load_collection_metadata(path):
+    """
+    Return the metadata of the collection a snapshot was exported from, or None.
+    Pass it to get_or_create_collection() so settings like a shard's region survive a restore.
+    """
+    with open(os.path.join(path, TABLE_FILE), "r", encoding="utf-8") as f:
+        return json.load(f).get("collection_metadata")
+
+
+def restore_snapshot(collection, path, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Restore a snapshot into a collection through batched upserts.
+    Returns the number of records restored.
+    """
+    ids, embeddings, documents, metadatas = load_snapshot(path)
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=np.asarray(embeddings[start:end]),
+            documents=documents[start:end],
+            # Chroma rejects empty metadata dicts
+            metadatas=[meta or None for meta in metadatas[start:end]],
+        )
+    return len(ids)
+
+
+def export_collections(collections, path, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Export several collections (e.g. region shards and the article index) into one
+    subdirectory each, named after the collection. Returns {name: records written}.
+    """
+    return {
+        collection.name: export_snapshot(collection, os.path.join(path, collection.name), batch_size)
+        for collection in collections
+    }
+
+
+def restore_collections(client, path, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Restore every collection subdirectory written by export_collections(), creating
+    each collection with its saved metadata. Returns {name: records restored}.
+    """
+    counts = {}
+    for name in sorted(os.listdir(path)):
+        if not os.path.isfile(os.path.join(path, name, TABLE_FILE)):
+            continue
+        collection = client.get_or_create_collection(name=name, metadata=load_collection_metadata(os.path.join(path, name)))
+        counts[name] = restore_snapshot(collection, os.path.join(path, name), batch_size)
+    return counts
@@ -0,0 +1,139 @@
+import time
+import queue
+import threading
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a streaming pipeline. func receives a single item (or a list of
+    up to batch_size items when batch_size > 1) and returns an iterable of
+    outputs for the next stage, which may be empty to drop the item.
+    """
+    def __init__(self, name, func, workers=1, batch_size=1, flush_seconds=0.5):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._remaining = workers
+
+    def _next_batch(self, inbox):
+        """
+        Block for the first item, then collect more until the batch is full or
+        flush_seconds have passed, so a lone item is never held back for long.
+        """
+        first = inbox.get()
+        if first is _DONE or self.batch_size == 1:
+            return first, False
+        batch = [first]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def run(self, inbox, outbox):
+        while True:
+            item, done = self._next_batch(inbox)
+            if item is not _DONE:
+                start = time.perf_counter()
+                count = len(item) if self.batch_size > 1 else 1
+                try:
+                    outputs = list(self.func(item))
+                except Exception as e:
+                    outputs = []
+                    with self._lock:
+                        self.errors += count
+                    print(f"⚠️ Stage '{self.name}' failed: {e}")
+                with self._lock:
+                    self.items_in += count
+                    self.items_out += len(outputs)
+                    self.busy_seconds += time.perf_counter() - start
+                for output in outputs:
+                    # Blocks when the next stage falls behind, which is what keeps memory flat
+                    outbox.put(output)
+            if item is _DONE or done:
+                with self._lock:
+                    self._remaining -= 1
+                    last = self._remaining == 0
+                # Pass the marker on to sibling workers, the last one closes the next stage
+                (outbox if last else inbox).put(_DONE)
+                return
+
+
+class StreamingPipeline:
+    """
+    Runs a source iterable through a chain of stages, each on its own threads,
+    connected by bounded queues. Per-stage counters are reported periodically.
+    """
+    def __init__(self, source, stages, queue_size=64, report_seconds=10.0):
+        self.source = source
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+        self.report_seconds = report_seconds
+        self.produced = 0
+        self.started = None
+        self._finished = threading.Event()
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                self.queues[0].put(item)
+                self.produced += 1
+        except Exception as e:
+            print(f"⚠️ Source failed: {e}")
+        finally:
+            self.queues[0].put(_DONE)
+
+    def _drain(self):
+        # The last queue has no consumer stage, so keep it from filling up
+        while self.queues[-1].get() is not _DONE:
+            pass
+
+    def _report_loop(self):
+        while not self._finished.wait(self.report_seconds):
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.monotonic() - self.started
+        print(f"{'✅ Ingest finished' if final else '⏱️ Ingest progress'} after {elapsed:.1f}s, {self.produced} items from source")
+        for stage, inbox in zip(self.stages, self.queues):
+            throughput = stage.items_in / elapsed if elapsed else 0.0
+            utilization = stage.busy_seconds / (elapsed * stage.workers) * 100 if elapsed else 0.0
+            print(f"  {stage.name:<8} in={stage.items_in:<6} out={stage.items_out:<6} errors={stage.errors:<4} "
+                  f"queued={inbox.qsize():<4} {throughput:8.1f} items/s  {utilization:5.1f}% busy")
+        if final and self.stages:
+            bottleneck = max(self.stages, key=lambda s: s.busy_seconds / s.workers)
+            print(f"  Bottleneck: {bottleneck.name}")
+
+    def run(self):
+        self.started = time.monotonic()
+        threads = [threading.Thread(target=self._produce, daemon=True)]
+        for stage, inbox, outbox in zip(self.stages, self.queues, self.queues[1:]):
+            threads += [threading.Thread(target=stage.run, args=(inbox, outbox), daemon=True) for _ in range(stage.workers)]
+        threads.append(threading.Thread(target=self._drain, daemon=True))
+        reporter = threading.Thread(target=self._report_loop, daemon=True)
+
+        for thread in threads:
+            thread.start()
+        reporter.start()
+        for thread in threads:
+            thread.join()
+        self._finished.set()
+        self.report(final=True)
@@ -0,0 +1,65 @@
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the chat completion endpoint, to exercise the deadline,
+# hedging and extractive fallback in qa.py without calling Hugging Face.
+# Run it, then start qa.py/app.py with HF_BASE_URL=http://localhost:8080
+
+
+def make_handler(delay, jitter, fail_rate):
+    class FakeChatHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            time.sleep(delay + random.uniform(0, jitter))
+            if random.random() < fail_rate:
+                self.send_error(503, "Fake server failure")
+                return
+
+            messages = json.loads(body or b"{}").get("messages", [])
+            query = messages[-1]["content"] if messages else ""
+            payload = json.dumps({
+                "id": "fake-chat",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "fake",
+                "system_fingerprint": "",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": f"Fake answer for: {query}"},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            print(f"[fake-llm] {self.address_string()} {format % args}")
+
+    return FakeChatHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slow/failing fake chat completion server for local testing.")
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay of up to this many seconds')
+    parser.add_argument('--fail_rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 503')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay, args.jitter, args.fail_rate))
+    print(f"Fake LLM server on http://127.0.0.1:{args.port} (delay={args.delay}s, jitter={args.jitter}s, fail_rate={args.fail_rate})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -9,50 +9,166 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from core.retrieval import ARTICLE_COLLECTION_NAME, ARTICLE_POOLING, pool_article_embeddings
+from core.sharding import SHARD_BY_REGION, shard_name, list_shards, region_keys
+from core.shared_index import SHARED_INDEX_PATH, publish_shared_index
+from core.snapshot import iter_collection_batches
+
 CLEANED_DATA_PATH = os.getenv("CLEANED_DATA_PATH", "cleaned/cleaned_data.json")
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+COLLECTION_NAME = "food_places"
 
-with open(CLEANED_DATA_PATH, "r", encoding="utf-8") as f:
-    dataset = json.load(f)
 
-print(f"Loaded {len(dataset)} processed articles from {CLEANED_DATA_PATH}")
+class EmbeddingWriter:
+    """
+    Writes embedded articles into the chunk collection (or its region shards)
+    and the article-level index. Shared by the batch build and the streaming ingest.
+    """
+    def __init__(self, client, shard_by_region=SHARD_BY_REGION):
+        self.client = client
+        self.shard_by_region = shard_by_region
+        self.collection = client.get_or_create_collection(name=COLLECTION_NAME)
+        self.article_collection = client.get_or_create_collection(name=ARTICLE_COLLECTION_NAME)
+        self.shards = list_shards(client, COLLECTION_NAME) if shard_by_region else {}
 
-persist_directory = CHROMA_DB_PATH
+    def reset(self):
+        # Clear the collection if needed; delete(where={"$exists": True}) did not
+        # match anything, so recreate the collection instead
+        self.client.delete_collection(name=COLLECTION_NAME)
+        self.collection = self.client.create_collection(name=COLLECTION_NAME)
 
-# Load sentence-transformers model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+        # Rebuild the article-level index from scratch
+        self.client.delete_collection(name=ARTICLE_COLLECTION_NAME)
+        self.article_collection = self.client.create_collection(name=ARTICLE_COLLECTION_NAME)
 
-# Init Chroma DB
-client = chromadb.PersistentClient(path=persist_directory)
+        # Region shards are rebuilt from scratch as well
+        for shard in self.shards.values():
+            self.client.delete_collection(name=shard.name)
+        self.shards = {}
 
-collection = client.get_collection(name="food_places")
+    def get_shard(self, region):
+        if region not in self.shards:
+            self.shards[region] = self.client.get_or_create_collection(
+                name=shard_name(COLLECTION_NAME, region), metadata={"region": region}
+            )
+        return self.shards[region]
 
-if collection is None:
-    print("Collection not found. Creating a new one.")
-    collection = client.create_collection(name="food_places")
+    def write_article(self, entry, source_index, embeddings, chunk_ids=None, article_id=None, replace=False):
+        """
+        Upsert one article's chunks and its pooled article vector.
+        Ids default to random UUIDs; pass stable ids to make re-ingesting idempotent.
+        With replace=True, records left from an earlier write of the same url (chunks past
+        the new chunk count, shards the article has left, older ids) are deleted afterwards.
+        """
+        chunks = entry["article_text"]
+        article_metadata = {
+            "name": entry["name"],
+            "url": entry.get("url", ""),
+            "location": entry.get("location", ""),
+            "cuisine_type": entry.get("cuisine_type", ""),
+            "region": ", ".join(entry.get("regions", [])),
+            "venue_type": entry.get("venue_type", ""),
+            "source_index": source_index,
+            # One boolean key per region so region filters also match multi-region articles
+            **region_keys(entry.get("regions", [])),
+        }
 
-# Clear the collection if needed
-collection.delete(where={"$exists": True})
+        chunk_records = dict(
+            documents=chunks,
+            embeddings=embeddings.tolist(),
+            ids=chunk_ids or [str(uuid.uuid4()) for _ in chunks],
+            metadatas=[{**article_metadata, "chunk": j} for j in range(len(chunks))]
+        )
+        if self.shard_by_region:
+            # Multi-region articles go into every matching shard under the same ids
+            targets = [self.get_shard(region) for region in entry.get("regions", []) or ["Unknown"]]
+        else:
+            targets = [self.collection]
+        for target in targets:
+            target.upsert(**chunk_records)
 
-# enumerate over dataset with tqdm
-for i, entry in tqdm(enumerate(dataset), total=len(dataset)):
-    chunks = entry.get("article_text", [''])
+        # One pooled vector per article, used to pick articles before scoring chunks
+        article_id = article_id or str(uuid.uuid4())
+        self.article_collection.upsert(
+            embeddings=[pool_article_embeddings(embeddings, ARTICLE_POOLING).tolist()],
+            ids=[article_id],
+            metadatas=[{**article_metadata, "chunk_count": len(chunks)}]
+        )
 
-    for j, chunk in enumerate(chunks):
-        embedding = model.encode(chunk).tolist()
+        if replace and article_metadata["url"]:
+            # Deleted after the upsert, so the article never drops out of search in between
+            written = {target.name for target in targets}
+            for collection in self.chunk_sources():
+                self._delete_stale(collection, article_metadata["url"], chunk_records["ids"] if collection.name in written else [])
+            self._delete_stale(self.article_collection, article_metadata["url"], [article_id])
 
-        collection.add(
-            documents=[chunk],
-            embeddings=[embedding],
-            ids=[str(uuid.uuid4())],
-            metadatas=[{
-                "name": entry["name"],
-                "location": entry.get("location", ""),
-                "cuisine_type": entry.get("cuisine_type", ""),
-                "region": ", ".join(entry.get("regions", [])),
-                "source_index": i,
-                "chunk": j
-            }]
-        )
+    def _delete_stale(self, collection, url, keep_ids):
+        stored = collection.get(where={"url": url}, include=[])
+        keep_ids = set(keep_ids)
+        stale = [record_id for record_id in stored["ids"] if record_id not in keep_ids]
+        if stale:
+            collection.delete(ids=stale)
+
+    def source_index_of(self, url):
+        """
+        Return the source_index an article was stored under, or None if it is new.
+        """
+        found = self.article_collection.get(where={"url": url}, limit=1, include=["metadatas"])
+        return found["metadatas"][0].get("source_index") if found["ids"] else None
+
+    def next_source_index(self):
+        """
+        Return one past the highest source_index in the article index, so articles
+        added later continue the numbering of the batch build.
+        """
+        indexes = [
+            meta.get("source_index", -1)
+            for batch in iter_collection_batches(self.article_collection, include=["metadatas"])
+            for meta in batch["metadatas"]
+        ]
+        return max(indexes, default=-1) + 1
+
+    def chunk_sources(self):
+        return list(self.shards.values()) if self.shard_by_region else [self.collection]
+
+    def publish(self):
+        # Chunks and articles go into one generation, so workers switch both together
+        return publish_shared_index({
+            COLLECTION_NAME: self.chunk_sources(),
+            ARTICLE_COLLECTION_NAME: [self.article_collection],
+        }, SHARED_INDEX_PATH)
+
+
+def main():
+    with open(CLEANED_DATA_PATH, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+
+    print(f"Loaded {len(dataset)} processed articles from {CLEANED_DATA_PATH}")
+
+    # Load sentence-transformers model
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+
+    # Init Chroma DB
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    writer = EmbeddingWriter(client)
+    writer.reset()
+
+    # enumerate over dataset with tqdm
+    for i, entry in tqdm(enumerate(dataset), total=len(dataset)):
+        chunks = entry.get("article_text", [''])
+        if not chunks:
+            continue
+        writer.write_article(entry, i, model.encode(chunks))
+
+    print(f"📀 Saved {len(dataset)} article embeddings into local vector DB")
+    if writer.shard_by_region:
+        for region, shard in sorted(writer.shards.items()):
+            print(f"🧩 Shard '{shard.name}' ({region}): {shard.count()} chunks")
+    print(f"🗂️ Built article index '{ARTICLE_COLLECTION_NAME}' with {writer.article_collection.count()} {ARTICLE_POOLING}-pooled vectors")
+
+    if SHARED_INDEX_PATH:
+        generation = writer.publish()
+        print(f"🔗 Published shared index generation {generation} to {SHARED_INDEX_PATH}")
 
-print(f"📀 Saved {len(dataset)} article embeddings into local vector DB")
+if __name__ == "__main__":
+    main()
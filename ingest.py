@@ -0,0 +1,155 @@
+import os
+import time
+import uuid
+import itertools
+import threading
+import argparse
+import chromadb
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+
+load_dotenv()
+
+from scraper import config, iter_article_urls, parse_article
+from process_data import (
+    DataCleaningPipeline, extract_addresses, classify_region, classify_venue_type,
+    filter_articles, sentence_based_chunk_text
+)
+from gen_embeddings import EmbeddingWriter, CHROMA_DB_PATH
+from core.near_dedup import NearDuplicateFilter
+from core.shared_index import SHARED_INDEX_PATH
+from core.streaming import Stage, StreamingPipeline
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+INGEST_FETCH_WORKERS = int(os.getenv("INGEST_FETCH_WORKERS", "4"))
+INGEST_FETCH_DELAY = float(os.getenv("INGEST_FETCH_DELAY", "1.5"))
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "0.5"))
+# Workers on the shared index only see what has been published, so publish while ingesting
+INGEST_PUBLISH_SECONDS = float(os.getenv("INGEST_PUBLISH_SECONDS", "60"))
+
+
+def unique_urls(urls):
+    # Same role as remove_duplicates, applied before anything is fetched
+    seen_urls = set()
+    for url in urls:
+        if url not in seen_urls:
+            seen_urls.add(url)
+            yield url
+
+
+class PeriodicPublisher:
+    """
+    Publishes the shared index every interval seconds on its own thread. A publish
+    re-exports the whole index, so running it inside the upsert stage would stall ingestion.
+    Articles upserted while a publish is reading may only appear in the next generation.
+    """
+    def __init__(self, writer, interval):
+        self.writer = writer
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def publish(self):
+        generation = self.writer.publish()
+        print(f"🔗 Published shared index generation {generation} to {SHARED_INDEX_PATH}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"⚠️ Publishing the shared index failed, retrying in {self.interval:.0f}s: {e}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        # Publish whatever arrived after the last timed publish
+        self.publish()
+
+
+def build_pipeline(model, writer, max_pages, fetch_workers, embed_batch, queue_size):
+    cleaning = DataCleaningPipeline([
+        extract_addresses,
+        classify_region,
+        classify_venue_type,
+        filter_articles,
+    ])
+    near_duplicates = NearDuplicateFilter()
+    # New articles are numbered after those already stored, e.g. by the batch build
+    source_index = itertools.count(writer.next_source_index())
+
+    def parse(url):
+        article = parse_article(url, config)
+        # Be polite to the source site, each fetch worker waits between requests
+        time.sleep(INGEST_FETCH_DELAY)
+        return [article] if article else []
+
+    def clean(article):
+        return cleaning.execute([article])
+
+    def chunk(article):
+        article = sentence_based_chunk_text([article])[0]
+        article['article_text'], article['near_duplicates'] = near_duplicates.filter_chunks(
+            article['url'], article['article_text']
+        )
+        return [article] if article['article_text'] else []
+
+    def embed(articles):
+        # One encode call for the whole batch, then split the rows back per article
+        chunks = [c for article in articles for c in article['article_text']]
+        embeddings = model.encode(chunks)
+        start = 0
+        for article in articles:
+            end = start + len(article['article_text'])
+            yield article, embeddings[start:end]
+            start = end
+
+    def upsert(item):
+        article, embeddings = item
+        # Stable ids so that re-ingesting an article updates it instead of duplicating it
+        chunk_ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{article['url']}#{j}")) for j in range(len(embeddings))]
+        # A re-ingested article keeps its number, and chunks it no longer has are deleted
+        index = writer.source_index_of(article['url'])
+        writer.write_article(article, next(source_index) if index is None else index, embeddings, chunk_ids=chunk_ids,
+                             article_id=str(uuid.uuid5(uuid.NAMESPACE_URL, article['url'])), replace=True)
+        return [article['url']]
+
+    stages = [
+        Stage("parse", parse, workers=fetch_workers),
+        Stage("clean", clean),
+        Stage("chunk", chunk),
+        Stage("embed", embed, batch_size=embed_batch, flush_seconds=INGEST_FLUSH_SECONDS),
+        Stage("upsert", upsert),
+    ]
+    source = unique_urls(iter_article_urls(config, max_pages=max_pages))
+    return StreamingPipeline(source, stages, queue_size=queue_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream scrape -> process -> embed -> upsert into the vector DB.")
+    parser.add_argument('--max_pages', type=int, default=5, help='Number of listing pages to crawl')
+    parser.add_argument('--fetch_workers', type=int, default=INGEST_FETCH_WORKERS, help='Concurrent article fetchers')
+    parser.add_argument('--embed_batch', type=int, default=INGEST_EMBED_BATCH, help='Max articles per embedding batch')
+    parser.add_argument('--queue_size', type=int, default=INGEST_QUEUE_SIZE, help='Capacity of each queue between stages')
+    parser.add_argument('--publish_seconds', type=float, default=INGEST_PUBLISH_SECONDS, help='Seconds between shared index publishes while ingesting')
+    args = parser.parse_args()
+
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    writer = EmbeddingWriter(client)
+
+    pipeline = build_pipeline(model, writer, args.max_pages, args.fetch_workers, args.embed_batch, args.queue_size)
+    publisher = PeriodicPublisher(writer, args.publish_seconds).start() if SHARED_INDEX_PATH else None
+    try:
+        pipeline.run()
+    finally:
+        if publisher:
+            publisher.stop()
+
+if __name__ == "__main__":
+    main()
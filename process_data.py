@@ -1,19 +1,22 @@
 import json
 import re
 import os
+from functools import lru_cache
 from tqdm import tqdm
 from dotenv import load_dotenv
 
 from transformers import AutoTokenizer
 
+# Load environment variables from .env file
+load_dotenv()
+
+from core.near_dedup import NearDuplicateFilter
+
 import nltk
 from nltk.tokenize import sent_tokenize
 nltk.download('punkt_tab')
 
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Define file paths from environment variables or use defaults
 RAW_INPUT_PATH = os.getenv("RAW_INPUT_PATH", "raw/data.json")
 CLEANED_OUTPUT_PATH = os.getenv("CLEANED_OUTPUT_PATH", "cleaned/cleaned_data.json")
@@ -90,9 +93,14 @@ def chunk_text(data, chunk_size=500):
 
     return [chunk_article_text(article) for article in data]
 
+# Load the tokenizer once, chunking is also called per article by the streaming ingest
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    return AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+
 # Chunk article text into smaller segments based on sentences
 def sentence_based_chunk_text(data, max_tokens=400, overlap=50):
-    tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+    tokenizer = get_tokenizer()
 
     for article in data:
         text = article.get('article_text', '')
@@ -134,6 +142,24 @@ def sentence_based_chunk_text(data, max_tokens=400, overlap=50):
 
     return data
 
+# Collapse near-duplicate chunks (syndicated reviews, boilerplate footers) using MinHash/LSH
+def remove_near_duplicate_chunks(data):
+    """
+    Drops chunks whose estimated Jaccard similarity to an earlier chunk reaches
+    NEAR_DUP_THRESHOLD. Each removed chunk is recorded in the article's
+    'near_duplicates' list with a pointer to its canonical chunk.
+    """
+    near_duplicates = NearDuplicateFilter()
+    for a, article in enumerate(tqdm(data)):
+        if 'article_text' in article:
+            article['article_text'], article['near_duplicates'] = near_duplicates.filter_chunks(
+                article.get('url', a), article['article_text']
+            )
+
+    stats = near_duplicates.stats()
+    print(f"Near-duplicate removal: {stats['total']} -> {stats['kept']} chunks ({stats['removed']} removed, {stats['reduction']:.1f}% smaller index)")
+    return data
+
 
 # Classify Singapore region based on extracted postal code
 def classify_sg_region_from_address(address):
@@ -157,16 +183,31 @@ def classify_sg_region_from_address(address):
     else:
         return "Unknown"
 
+# Lookup table from 2-digit postal prefix to region, built once from the same rules
+POSTAL_PREFIX_REGIONS = tuple(classify_sg_region_from_address(f"S{prefix:02d}0000") for prefix in range(100))
+POSTAL_CODE_PATTERN = re.compile(r"\bS(?:ingapore)?\s*(\d{6})\b")
+
+def classify_regions_from_addresses(addresses):
+    """
+    Return the unique known regions of an article's addresses, in order of first appearance.
+    Uses one precompiled postal code pattern and the prefix lookup table.
+    """
+    regions = {}
+    for address in addresses:
+        match = POSTAL_CODE_PATTERN.search(address)
+        if match:
+            region = POSTAL_PREFIX_REGIONS[int(match.group(1)[:2])]
+            if region != "Unknown":
+                regions[region] = None
+    return list(regions)
+
 def classify_region(data):
     """
     Classify the region of each article based on the extracted addresses.
     """
     for article in data:
         if 'addresses' in article:
-            regions = [classify_sg_region_from_address(addr) for addr in article['addresses']]
-            article['regions'] = list(set(regions))  # remove duplicates
-            # remove 'Unknown' regions
-            article['regions'] = [region for region in article['regions'] if region != 'Unknown']
+            article['regions'] = classify_regions_from_addresses(article['addresses'])
     return data
 
 def classify_venue_type_from_text(text):
@@ -191,13 +232,47 @@ def classify_venue_type_from_text(text):
     else:
         return "restaurant"  # default fallback
 
+# Venue keywords in priority order as (substring, allowed suffix, venue type), matched as
+# whole words so "bar" no longer matches "barbecue". Plural and accented forms share the
+# substring ("baker", "caf") to keep one scan per keyword. "restaurant" is the fallback
+# anyway, so it is not searched for.
+VENUE_KEYWORDS = [
+    ("hawker", "s?", "hawker"),
+    ("stall", "s?", "hawker"),
+    ("food court", "s?", "food court"),
+    ("baker", "(?:y|ies)", "bakery"),
+    ("caf", "[eé]s?", "cafe"),
+    ("bar", "s?", "pub"),
+    ("pub", "s?", "pub"),
+    ("bistro", "s?", "bistro"),
+    ("canteen", "s?", "canteen"),
+]
+# Each pattern starts with the literal substring followed by a lookbehind for the word
+# boundary before it, which keeps the regex engine on its fast literal search
+VENUE_KEYWORD_PATTERNS = [
+    (word, re.compile(rf"{re.escape(word)}(?<=\b{re.escape(word)}){suffix}\b").search, venue_type)
+    for word, suffix, venue_type in VENUE_KEYWORDS
+]
+
+def classify_venue_type_from_words(text):
+    """
+    Like classify_venue_type_from_text, but keywords only count as whole words.
+    A substring scan finds each candidate and the boundary pattern confirms it from there.
+    """
+    text_lower = text.lower()
+    for word, search, venue_type in VENUE_KEYWORD_PATTERNS:
+        found = text_lower.find(word)
+        if found >= 0 and search(text_lower, found):
+            return venue_type
+    return "restaurant"  # default fallback
+
 def classify_venue_type(data):
     """
     Classify the venue type of each article based on the article text.
     """
     for article in data:
         if 'article_text' in article:
-            article['venue_type'] = classify_venue_type_from_text(article['article_text'])
+            article['venue_type'] = classify_venue_type_from_words(article['article_text'])
     return data
 
 # Remove duplicate articles with same url 
@@ -210,39 +285,44 @@ def remove_duplicates(data):
             unique_data.append(article)
     return unique_data
 
-# Path to the JSON file
-file_path = RAW_INPUT_PATH
+def main():
+    # Path to the JSON file
+    file_path = RAW_INPUT_PATH
+
+    # Read the JSON file
+    with open(file_path, 'r') as file:
+        data = json.load(file)
 
-# Read the JSON file
-with open(file_path, 'r') as file:
-    data = json.load(file)
+    print(f"Loaded {len(data)} articles from {file_path}")
 
-print(f"Loaded {len(data)} articles from {file_path}")
+    # Initialize the pipeline
+    pipeline = DataCleaningPipeline([
+        remove_duplicates,
+        extract_addresses,
+        classify_region,
+        classify_venue_type,
+        filter_articles,
+        # chunk_text
+        sentence_based_chunk_text,
+        remove_near_duplicate_chunks
+    ])
 
-# Initialize the pipeline
-pipeline = DataCleaningPipeline([
-    remove_duplicates,
-    extract_addresses,
-    classify_region,
-    classify_venue_type,
-    filter_articles,
-    # chunk_text
-    sentence_based_chunk_text
-])
+    # Execute the pipeline
+    cleaned_data = pipeline.execute(data)
 
-# Execute the pipeline
-cleaned_data = pipeline.execute(data)
+    # Debugging output
+    print(f'Processed {len(cleaned_data)} articles.')
+    # for article in cleaned_data:
+        # print(article['name'])
+        # print('chunks:', len(article['article_text']))
 
-# Debugging output
-print(f'Processed {len(cleaned_data)} articles.')
-# for article in cleaned_data:
-    # print(article['name'])
-    # print('chunks:', len(article['article_text']))
 
+    # Save output to a new JSON file
+    output_file_path = CLEANED_OUTPUT_PATH
+    with open(output_file_path, 'w') as file:
+        json.dump(cleaned_data, file, indent=4)
 
-# Save output to a new JSON file
-output_file_path = CLEANED_OUTPUT_PATH
-with open(output_file_path, 'w') as file:
-    json.dump(cleaned_data, file, indent=4)
+    print(f"Cleaned data saved to {output_file_path}")
 
-print(f"Cleaned data saved to {output_file_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
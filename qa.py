@@ -3,14 +3,22 @@ from huggingface_hub import InferenceClient
 from sentence_transformers import SentenceTransformer
 import chromadb
 from dotenv import load_dotenv
-from core.retrieval import retrieve_relevant_chunks, calculate_similarity, calculate_penalized_score
+
+load_dotenv()
+
+from core.retrieval import retrieve_relevant_chunks, calculate_similarity, calculate_penalized_score, open_article_collection
+from core.retrieval import ARTICLE_COLLECTION_NAME
+from core.sharding import SHARD_BY_REGION, ShardedCollection
+from core.shared_index import SHARED_INDEX_PATH, SharedIndex, list_shared_indexes
+from core.llm import HedgedChatClient, build_extractive_answer, LLM_DEADLINE_SECONDS
 
 
 # --- CONFIG ---
-load_dotenv()
 HUGGINGFACE_TOKEN = os.getenv("HF_TOKEN") 
 
 HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.3"
+# Point the chat client at another OpenAI-compatible endpoint, e.g. fake_llm_server.py
+HF_BASE_URL = os.getenv("HF_BASE_URL", "")
 
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
 COLLECTION_NAME = "food_places"
@@ -18,20 +26,37 @@ COLLECTION_NAME = "food_places"
 # --- INIT ---
 
 embedder = SentenceTransformer("all-MiniLM-L6-v2")
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = client.get_or_create_collection(COLLECTION_NAME)
+if SHARED_INDEX_PATH:
+    # Memory-mapped index published by gen_embeddings.py, shared by all worker processes
+    collection = SharedIndex(SHARED_INDEX_PATH, COLLECTION_NAME)
+    article_collection = None
+    if ARTICLE_COLLECTION_NAME in list_shared_indexes(SHARED_INDEX_PATH):
+        article_collection = SharedIndex(SHARED_INDEX_PATH, ARTICLE_COLLECTION_NAME)
+else:
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    if SHARD_BY_REGION:
+        # Region shards built by gen_embeddings.py, queried in parallel and merged
+        collection = ShardedCollection.from_client(client, COLLECTION_NAME)
+        print(f"Loaded region shards: {collection.shard_sizes()}")
+    else:
+        collection = client.get_or_create_collection(COLLECTION_NAME)
+    # Article-level index for two-stage retrieval, None if gen_embeddings.py has not built it
+    article_collection = open_article_collection(client)
 
 # Hugging Face inference client
 hf_client = InferenceClient(
-    model=HF_MODEL,
-    token=HUGGINGFACE_TOKEN
+    model=HF_BASE_URL or HF_MODEL,
+    token=HUGGINGFACE_TOKEN,
+    timeout=LLM_DEADLINE_SECONDS
 )
+# Deadline-bound, hedged calls on a pooled set of request threads
+llm_client = HedgedChatClient(hf_client)
 
 # --- RAG COMPONENTS ---
 
 def retrieve_chunks(query, top_k=5, metadata_filter=None, top_j=2):
     # Use the same retrieval logic as before, but group and summarize chunks per article
-    results = retrieve_relevant_chunks(query, collection, embedder, metadata_filter=metadata_filter, top_k=top_k, top_j=top_j)
+    results = retrieve_relevant_chunks(query, collection, embedder, metadata_filter=metadata_filter, top_k=top_k, top_j=top_j, article_collection=article_collection)
     summarized_chunks = []
     for article in results:
         # Combine all top chunks for this article into a single summary
@@ -66,7 +91,7 @@ def generate_prompt_context(context_chunks):
         formatted_chunks.append(formatted_chunk)
     return "\n---\n".join(formatted_chunks)
 
-def generate_chat_response(query, context):
+def generate_chat_response(query, context, context_chunks=None):
     system_prompt = (
     "You are a helpful assistant that recommends food places in Singapore based on the given context.\n\n"
     "When answering:\n"
@@ -90,17 +115,14 @@ def generate_chat_response(query, context):
         {"role": "user", "content": query}
     ]
 
-    try:
-        response = hf_client.chat_completion(
-            messages=messages,
-            temperature=0.5,
-            max_tokens=500,
-            top_p=0.7,
-        )
-        return response.choices[0].message["content"]
-    except Exception as e:
-        print(f"[ERROR] Hugging Face chat completion failed: {e}")
-        return "Sorry, I couldn't generate a response."
+    # If the LLM fails or misses the deadline, answer straight from the retrieved chunks
+    return llm_client.chat_completion(
+        messages,
+        fallback=lambda: build_extractive_answer(query, context_chunks or []),
+        temperature=0.5,
+        max_tokens=500,
+        top_p=0.7,
+    )
 
 # --- METADATA EXTRACTION ---
 def extract_metadata_filter(query):
@@ -158,7 +180,7 @@ def answer_question(query):
     if should_override:
         return guardrail_response
     context = generate_prompt_context(chunks)
-    return generate_chat_response(query, context)
+    return generate_chat_response(query, context, chunks)
 
 # --- INTERACTIVE LOOP ---
 
@@ -41,9 +41,8 @@ def parse_article(url, config):
         return None
 
 
-def scrape(config, max_pages=1, delay=1.5):
-    """Scrape reviews from a paginated listing page."""
-    results = []
+def iter_article_urls(config, max_pages=1):
+    """Yield article URLs from a paginated listing page, one listing page at a time."""
     next_url = config["start_url"]
 
     for i in range(1,max_pages+1):
@@ -52,16 +51,9 @@ def scrape(config, max_pages=1, delay=1.5):
         soup = fetch_page(next_url)
         article_links = soup.select(config["article_link_selector"])
 
-        article_urls = [
-            link["href"] if link["href"].startswith("http") else config["base_url"] + link["href"]
-            for link in article_links if link.has_attr("href")
-        ]
-
-        for url in tqdm(article_urls):
-            data = parse_article(url, config)
-            if data:
-                results.append(data)
-                time.sleep(delay)
+        for link in article_links:
+            if link.has_attr("href"):
+                yield link["href"] if link["href"].startswith("http") else config["base_url"] + link["href"]
 
         next_page_selector = config.get("next_page_selector", "")
         if not next_page_selector:
@@ -76,6 +68,17 @@ def scrape(config, max_pages=1, delay=1.5):
             print("⚠️ No more pages to scrape.")
             break
 
+
+def scrape(config, max_pages=1, delay=1.5):
+    """Scrape reviews from a paginated listing page."""
+    results = []
+
+    for url in tqdm(iter_article_urls(config, max_pages=max_pages)):
+        data = parse_article(url, config)
+        if data:
+            results.append(data)
+            time.sleep(delay)
+
     return results
 
 
@@ -0,0 +1,58 @@
+import os
+import argparse
+import chromadb
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.snapshot import export_collections, restore_collections, SNAPSHOT_BATCH_SIZE
+from core.sharding import SHARD_BY_REGION, list_shards
+from core.shared_index import SHARED_INDEX_PATH, publish_shared_index
+from core.retrieval import ARTICLE_COLLECTION_NAME, open_article_collection
+
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "./snapshot")
+COLLECTION_NAME = "food_places"
+
+def chunk_sources(client, collection_name):
+    # Region shards when sharding is on, otherwise the single chunk collection
+    shards = list_shards(client, collection_name) if SHARD_BY_REGION else {}
+    return list(shards.values()) or [client.get_collection(name=collection_name)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore a Chroma DB snapshot.")
+    parser.add_argument('action', choices=['export', 'restore', 'publish'], help='Export the chunk collection (or its region shards) and the article index to a snapshot, restore a snapshot, or publish them as a shared index')
+    parser.add_argument('--path', type=str, default=SNAPSHOT_PATH, help='Snapshot directory, one subdirectory per collection')
+    parser.add_argument('--collection', type=str, default=COLLECTION_NAME, help='Chunk collection name')
+    parser.add_argument('--batch_size', type=int, default=SNAPSHOT_BATCH_SIZE, help='Records per get/upsert batch')
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+
+    if args.action == 'restore':
+        for name, count in restore_collections(client, args.path, batch_size=args.batch_size).items():
+            print(f"📀 Restored {count} records from {os.path.join(args.path, name)} into '{name}'")
+        return
+
+    collections = chunk_sources(client, args.collection)
+    article_collection = open_article_collection(client)
+
+    if args.action == 'export':
+        # Shards and the article index are exported too, so a restored host keeps two-stage retrieval
+        if article_collection is not None:
+            collections = collections + [article_collection]
+        for name, count in export_collections(collections, args.path, batch_size=args.batch_size).items():
+            print(f"📦 Exported {count} records from '{name}' to {os.path.join(args.path, name)}")
+    else:
+        if not SHARED_INDEX_PATH:
+            print("SHARED_INDEX_PATH is not set.")
+            return
+        indexes = {args.collection: collections}
+        # Publish the article index in the same generation so workers switch both together
+        if article_collection is not None:
+            indexes[ARTICLE_COLLECTION_NAME] = [article_collection]
+        generation = publish_shared_index(indexes, SHARED_INDEX_PATH, batch_size=args.batch_size)
+        print(f"🔗 Published {', '.join(indexes)} as shared index generation {generation} under {SHARED_INDEX_PATH}")
+
+if __name__ == "__main__":
+    main()
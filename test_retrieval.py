@@ -8,10 +8,14 @@ from dotenv import load_dotenv
 import math
 from collections import defaultdict
 import numpy as np
-from core.retrieval import retrieve_relevant_chunks
 
 load_dotenv()
 
+from core.retrieval import retrieve_relevant_chunks, open_article_collection, ARTICLE_COLLECTION_NAME
+from core.snapshot import iter_collection_batches
+from core.sharding import SHARD_BY_REGION, ShardedCollection
+from core.shared_index import SHARED_INDEX_PATH, SharedIndex, list_shared_indexes
+
 # Load unwanted keywords from environment variable (comma-separated)
 UNWANTED_KEYWORDS = os.getenv("UNWANTED_KEYWORDS", "Read more at:").split(",")
 UNWANTED_KEYWORDS = [kw.strip() for kw in UNWANTED_KEYWORDS if kw.strip()]
@@ -25,11 +29,23 @@ CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
 # Init Chroma DB
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = client.get_collection(name="food_places")
+if SHARED_INDEX_PATH:
+    collection = SharedIndex(SHARED_INDEX_PATH, "food_places")
+    article_collection = None
+    if ARTICLE_COLLECTION_NAME in list_shared_indexes(SHARED_INDEX_PATH):
+        article_collection = SharedIndex(SHARED_INDEX_PATH, ARTICLE_COLLECTION_NAME)
+    print(f"Attached to shared index generation {collection.generation}")
+else:
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    if SHARD_BY_REGION:
+        collection = ShardedCollection.from_client(client, "food_places")
+        print(f"Loaded region shards: {collection.shard_sizes()}")
+    else:
+        collection = client.get_collection(name="food_places")
+    article_collection = open_article_collection(client)
 
 def retrieve(query, top_k=5, top_j=2):
-    results = retrieve_relevant_chunks(query, collection, model, top_k=top_k, top_j=top_j)
+    results = retrieve_relevant_chunks(query, collection, model, top_k=top_k, top_j=top_j, article_collection=article_collection)
     print(f"\nTop {top_k} articles for query: '{query}' (showing up to {top_j} unique chunks per article)\n")
     for i, article in enumerate(results):
         article_name = article["article_name"]
@@ -45,15 +61,17 @@ def retrieve(query, top_k=5, top_j=2):
     if not results:
         print("No results found.")
 
-def browse():
+def browse(page_size=100):
     print("\nBrowsing all documents in the collection. Press Enter to see next, or 'q' to quit.\n")
-    # ChromaDB does not support direct iteration, so we fetch all ids first
-    all_ids = collection.get()["ids"]
-    batch_size = 1
-    for i in range(0, len(all_ids), batch_size):
-        batch_ids = all_ids[i:i+batch_size]
-        batch = collection.get(ids=batch_ids)
-        for doc, meta in zip(batch["documents"], batch["metadatas"]):
+    # Page through the collection in batches rather than fetching each id separately
+    sources = collection.shards.values() if SHARD_BY_REGION and not SHARED_INDEX_PATH else [collection]
+    seen_ids = set()
+    for batch in (b for source in sources for b in iter_collection_batches(source, batch_size=page_size)):
+        for record_id, doc, meta in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            # Multi-region articles appear in several shards
+            if record_id in seen_ids:
+                continue
+            seen_ids.add(record_id)
             print(f"Name: {meta.get('name', '')}")
             print(f"Location: {meta.get('location', '')}")
             print(f"Cuisine: {meta.get('cuisine_type', '')}")